@@ -1,14 +1,16 @@
 # imports
-from .nistchempy import __version__, \
-                        get_all_data, Compound, Spectrum, \
+from .nistchempy import __version__, close_session, \
+                        enable_cache, disable_cache, clear_cache, \
+                        get_all_data, get_compounds, Compound, Spectrum, \
                         print_search_parameters, \
                         SearchParameters, Search
 
 # module functions
 __all__ = [
-    '__version__',
-    'get_all_data',
-    'Compound', 'Spectrum'
+    '__version__', 'close_session',
+    'enable_cache', 'disable_cache', 'clear_cache',
+    'get_all_data', 'get_compounds',
+    'Compound', 'Spectrum',
     'print_search_parameters', 'SearchParameters', 'Search'
 ]
 
@@ -10,10 +10,11 @@ if sys.version_info < (3, 9):
 else:
     import importlib.resources as importlib_resources
 
-import re, os, requests, zipfile
-from urllib.parse import urlparse, parse_qs
-from bs4 import BeautifulSoup, Comment
-import pandas as pd
+import re, os, io, shutil, zipfile, functools, threading, atexit
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from urllib.parse import unquote_plus
+from html import unescape
 
 
 #%% Package info
@@ -21,47 +22,321 @@ import pandas as pd
 __version__ = '0.2.3'
 
 
+#%% Regular expressions
+
+_RE_FORM = re.compile(r'/cgi/cbook\.cgi\?Form=(.*?)&')
+_RE_FORMULA_SPACING = re.compile(r'(\d)([a-zA-Z])')
+_RE_MASK = re.compile(r'/cgi/cbook\.cgi.*?Mask=(\d+)')
+_RE_INDEX = re.compile(r'Index=(\d+)')
+_RE_ID = re.compile(r'[?&]ID=([^&#]+)')
+_RE_SYNONYM = re.compile(r'^[ \t\r;]*(.*?)[ \t\r;]*$', re.M)
+_RE_TOP_HEADER = re.compile(r'<h1\b[^>]*\bid\s*=\s*["\']?Top\b', re.I)
+_RE_UL = re.compile(r'<ul\b', re.I)
+_RE_COMMENT = re.compile(r'<!--(.*?)-->', re.S)
+_RE_H1 = re.compile(r'<h1\b[^>]*>(.*?)</h1>', re.S | re.I)
+_RE_OL = re.compile(r'<ol\b.*?</ol>', re.S | re.I)
+_RE_COMP_HREF = re.compile(r'<a\b[^>]*?\bhref\s*=\s*["\']([^"\']*/cgi/cbook\.cgi[^"\']*)["\']', re.I)
+_RE_LOST = re.compile(r'Due\s+to\s+the\s+large\s+number\s+of\s+matching\s+species')
+_RE_MOL_WEIGHT = re.compile(r'\d+(?:\.\d+)?')
+_RE_FIELDS = re.compile(r'\s*(Other names|Formula|Molecular weight|CAS Registry Number):')
+
+
+#%% Parsing
+
+# BeautifulSoup tree builder for NIST pages, html.parser is used if it is unavailable
+PARSER = 'lxml'
+
+# compound page: only header and info list are used
+_COMPOUND_TAGS = ['h1', 'ul']
+
+
+#%% HTTP session
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+# seconds to wait for NIST to connect or send data
+_TIMEOUT = 30
+# maximal number of simultaneous requests to NIST in the whole process,
+# nested thread pools of get_all_data and get_compounds share this limit
+_MAX_REQUESTS = 8
+_REQUEST_SLOTS = threading.BoundedSemaphore(_MAX_REQUESTS)
+
+
+def _configure_session(session):
+    '''
+    Mounts pooled adapter with retries on transient NIST errors to the session
+    and identifies the package in User-Agent header
+    '''
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    # the last 5xx response is returned, not raised, so "r.ok" checks keep working
+    adapter = HTTPAdapter(pool_connections = 16, pool_maxsize = 64,
+                          max_retries = Retry(total = 3, backoff_factor = 0.3,
+                                              status_forcelist = (500, 502, 503, 504),
+                                              raise_on_status = False))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = f'nistchempy/{__version__}'
+    return session
+
+
+def _get_session():
+    '''
+    Returns HTTP session shared by all requests to NIST, creates it on first use
+    '''
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            # requests is imported on first use to keep package import cheap
+            import requests
+            _SESSION = _configure_session(requests.Session())
+        return _SESSION
+
+
+def _http_get(url, **kwargs):
+    '''
+    Sends GET request through the shared session with the default timeout
+    '''
+    with _REQUEST_SLOTS:
+        return _get_session().get(url, timeout = _TIMEOUT, **kwargs)
+
+
+def _http_download(url, path, **kwargs):
+    '''
+    Streams body of successful GET response to file and returns the response;
+    the request slot is held until the body is read, the file is removed
+    if the download fails
+    '''
+    with _REQUEST_SLOTS:
+        with _get_session().get(url, timeout = _TIMEOUT, stream = True, **kwargs) as r:
+            if not r.ok:
+                return r
+            try:
+                with open(path, 'wb') as outf:
+                    for chunk in r.iter_content(65536):
+                        outf.write(chunk)
+            except BaseException:
+                # do not leave truncated file behind
+                if os.path.exists(path):
+                    os.remove(path)
+                raise
+    
+    return r
+
+
+def _replace_session(session):
+    '''
+    Replaces the shared HTTP session and closes the previous one;
+    compounds loaded through the old session are no longer reused
+    '''
+    _cached_compound.cache_clear()
+    global _SESSION
+    with _SESSION_LOCK:
+        old, _SESSION = _SESSION, session
+    if old is not None:
+        old.close()
+
+
+def enable_cache(cache_name = None, expire_after = 86400, backend = 'sqlite'):
+    '''
+    Caches NIST responses, requires requests-cache package
+    cache_name: path to the cache database, "~/.cache/nistchempy" by default
+    expire_after: lifetime of cached responses in seconds, None for no expiration;
+                  expired responses with ETag or Last-Modified header are
+                  revalidated by conditional requests instead of reloaded
+    backend: requests-cache storage, "sqlite" keeps responses between sessions,
+             "memory" only memoizes repeated requests within the process
+    '''
+    from requests_cache import CachedSession
+    if cache_name is None:
+        cache_name = os.path.join(os.path.expanduser('~'), '.cache', 'nistchempy')
+    session = CachedSession(cache_name, backend = backend,
+                            expire_after = expire_after, allowable_codes = (200,))
+    _replace_session(_configure_session(session))
+
+
+def disable_cache():
+    '''
+    Switches back to uncached requests, cached responses are kept on disk
+    '''
+    _replace_session(None)
+
+
+def clear_cache():
+    '''
+    Removes all responses from the cache enabled by enable_cache and
+    forgets compounds reused by get_compounds and Search.load_found_compounds
+    '''
+    _cached_compound.cache_clear()
+    with _SESSION_LOCK:
+        session = _SESSION
+    if hasattr(session, 'cache'):
+        session.cache.clear()
+
+
+def close_session():
+    '''
+    Closes connections kept open by the shared HTTP session;
+    new connections are opened on the next request
+    '''
+    with _SESSION_LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+
+
+#%% File I/O executor
+
+_IO_MAX_WORKERS = 8
+_IO_EXECUTOR = None
+_IO_LOCK = threading.Lock()
+
+
+def _get_io_executor():
+    '''
+    Returns thread pool shared by spectra saving, creates it on first use
+    '''
+    global _IO_EXECUTOR
+    with _IO_LOCK:
+        if _IO_EXECUTOR is None:
+            _IO_EXECUTOR = ThreadPoolExecutor(max_workers = _IO_MAX_WORKERS,
+                                              thread_name_prefix = 'nistchempy-io')
+            atexit.register(_IO_EXECUTOR.shutdown, wait = True)
+        return _IO_EXECUTOR
+
+
 #%% All NIST Data
 
-def get_all_data():
+@functools.lru_cache(maxsize = 1)
+def _load_all_data():
     '''
-    Returns pandas dataframe containing info on all NIST Chem WebBook compounds
+    Reads info on all NIST Chem WebBook compounds from the package data,
+    the dataframe is read once and cached
     '''
+    # pandas is imported on first use, it dominates package import time
+    import pandas as pd
+    
     dt0 = {'mol_weight': 'float64'}
-    dt1 = {k: 'string' for k in ('ID', 'name', 'formula', 'inchi', 'inchi_key', 'cas_rn')}
+    dt1 = {k: 'string' for k in ('ID', 'name', 'inchi', 'inchi_key', 'cas_rn')}
     dt2 = {k: 'bool' for k in ('mol2D', 'mol3D', 'cIR', 'cTZ', 'cMS', 'cUV', 'cGC',
                                'cTG', 'cTC', 'cTP', 'cSO', 'cTR', 'cIE', 'cIC', 'cES', 'cDI')}
     dtypes = {**dt0, **dt1, **dt2}
     pkg = importlib_resources.files('nistchempy')
     data_file = pkg / 'nist_data.zip'
     with importlib_resources.as_file(data_file) as path:
-        zf = zipfile.ZipFile(path) 
-        df = pd.read_csv(zf.open('nist_data.csv'), dtype = dtypes)
-        zf.close()
+        with zipfile.ZipFile(path) as zf:
+            data = zf.read('nist_data.csv')
+    try:
+        # multithreaded reader, needs pyarrow and pandas>=1.4
+        df = pd.read_csv(io.BytesIO(data), dtype = dtypes, engine = 'pyarrow')
+    except (ImportError, ValueError):
+        df = pd.read_csv(io.BytesIO(data), dtype = dtypes)
+    # converted after reading: categories are sorted, whichever engine was used
+    df['formula'] = df['formula'].astype('category')
     
     return df
 
 
+def get_all_data():
+    '''
+    Returns pandas dataframe containing info on all NIST Chem WebBook compounds
+    Many compounds share the same formula, so "formula" column is categorical
+    '''
+    return _load_all_data().copy()
+
+
 #%% Support functions
 
-def _is_compound(soup):
+def _fix_html(html):
+    '''
+    Fixes "clss=" typo in NIST webpages, html can be either str or bytes
+    '''
+    if isinstance(html, bytes):
+        return html.replace(b'clss=', b'class=')
+    return html.replace('clss=', 'class=')
+
+
+def _make_soup(html, encoding = None, parse_only = None):
+    '''
+    Parses NIST webpage with PARSER, falls back to html.parser if it is unavailable;
+    parse_only is a list of tag names to keep
+    '''
+    from bs4 import BeautifulSoup, SoupStrainer, FeatureNotFound
+    html = _fix_html(html)
+    if parse_only is not None:
+        parse_only = SoupStrainer(parse_only)
+    try:
+        return BeautifulSoup(html, features = PARSER, parse_only = parse_only,
+                             from_encoding = encoding)
+    except FeatureNotFound:
+        return BeautifulSoup(html, features = 'html.parser', parse_only = parse_only,
+                             from_encoding = encoding)
+
+
+def _parse_synonyms(text):
     '''
-    Checks if html is a single compound page and returns NIST ID if yes
+    Splits "Other names" field into the list of synonyms
     '''
-    header = soup.findAll('h1', {'id': 'Top'})
+    return [_ for _ in _RE_SYNONYM.findall(text) if _]
+
+
+def _parse_formula(text):
+    '''
+    Separates formula elements with spaces
+    '''
+    return _RE_FORMULA_SPACING.sub(r'\1 \2', text.strip())
+
+
+def _parse_mol_weight(text):
+    '''
+    Returns the first number of "Molecular weight" field, None if there is none
+    '''
+    match = _RE_MOL_WEIGHT.search(text)
+    return float(match.group()) if match else None
+
+
+# compound info field label: (Compound attribute, parser of the field value)
+_FIELD_PARSERS = {'Other names': ('synonyms', _parse_synonyms),
+                  'Formula': ('formula', _parse_formula),
+                  'Molecular weight': ('mol_weight', _parse_mol_weight),
+                  'CAS Registry Number': ('cas_rn', str.strip)}
+
+
+def _unquote_id(ID):
+    '''
+    Decodes URL-quoted NIST ID, plain IDs are returned as is
+    '''
+    if '%' in ID or '+' in ID:
+        return unquote_plus(ID)
+    return ID
+
+
+def _run_concurrently(tasks, max_workers):
+    '''
+    Runs callables in a thread pool and returns their results in the same order
+    '''
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        futures = [executor.submit(task) for task in tasks]
+    
+    return [future.result() for future in futures]
+
+
+def _is_compound(html):
+    '''
+    Checks if html text is a single compound page and returns NIST ID if yes
+    '''
+    header = _RE_TOP_HEADER.search(html)
     if not header:
         return None
     # get info
-    header = header[0]
-    info = header.findNext('ul')
-    if not info:
+    if not _RE_UL.search(html, header.end()):
         return None
     # extract NIST ID
-    for comment in soup.findAll(text = lambda text: isinstance(text, Comment)):
-        comment = str(comment).replace('\r\n', '').replace('\n', '')
+    for comment in _RE_COMMENT.findall(html):
+        comment = comment.replace('\r\n', '').replace('\n', '')
         if not '/cgi/cbook.cgi' in comment:
             continue
-        return re.search(r'/cgi/cbook.cgi\?Form=(.*?)&', comment).group(1)
+        match = _RE_FORM.search(comment)
+        return match.group(1) if match else None
     
     return None
 
@@ -73,16 +348,41 @@ class Spectrum():
     Class for IR, MS, and UV-Vis extracted from NIST Chemistry WebBook
     '''
     
+    __slots__ = ('compound', 'spec_type', 'spec_idx', 'path', 'encoding', '_jdx_text')
+    
     _pretty_names = {'IR': 'IR spectrum',
                      'TZ': 'THz IR spectrum',
                      'MS': 'Mass spectrum',
                      'UV': 'UV-Vis spectrum'}
     
-    def __init__(self, compound, spec_type, spec_idx, jdx):
+    def __init__(self, compound, spec_type, spec_idx, jdx = None, path = None,
+                 encoding = None):
         self.compound = compound
         self.spec_type = spec_type
         self.spec_idx = spec_idx
-        self.jdx_text = jdx
+        self.path = path
+        self.encoding = encoding
+        self._jdx_text = jdx
+    
+    @property
+    def jdx_text(self):
+        '''
+        Spectrum in JDX format; spectra downloaded directly to disk
+        are read from the file on access and decoded with the encoding
+        of NIST response, undecodable bytes are replaced
+        '''
+        if self._jdx_text is None and self.path:
+            with open(self.path, 'rb') as inpf:
+                data = inpf.read()
+            try:
+                return data.decode(self.encoding or 'utf-8', errors = 'replace')
+            except LookupError:
+                return data.decode('utf-8', errors = 'replace')
+        return self._jdx_text
+    
+    @jdx_text.setter
+    def jdx_text(self, jdx):
+        self._jdx_text = jdx
     
     def save(self, name = None, path_dir = None):
         '''
@@ -91,8 +391,21 @@ class Spectrum():
         path = name if name else f'{self.compound.ID}_{self.spec_type}_{self.spec_idx}.jdx'
         if path_dir:
             path = os.path.join(path_dir, path)
-        with open(path, 'w') as outf:
-            outf.write(self.jdx_text)
+        # spectrum downloaded to disk is copied as is, without decoding
+        if self._jdx_text is None and self.path:
+            if not (os.path.exists(path) and os.path.samefile(self.path, path)):
+                shutil.copyfile(self.path, path)
+            return
+        jdx = self.jdx_text.encode('utf-8')
+        with open(path, 'wb') as outf:
+            outf.write(jdx)
+    
+    def save_async(self, name = None, path_dir = None):
+        '''
+        Saves spectrum in JDX format in the shared I/O thread pool,
+        returns concurrent.futures.Future
+        '''
+        return _get_io_executor().submit(self.save, name, path_dir)
     
     def __str__(self):
         return f'Spectrum({self.compound.ID}, {self._pretty_names[self.spec_type]} #{self.spec_idx})'
@@ -104,84 +417,86 @@ class Spectrum():
 class Compound():
     '''
     Object for NIST Chemistry WebBook compound
+    html: already downloaded compound webpage; if given, compound info
+          is parsed from it instead of being requested from NIST
     '''
     
+    __slots__ = ('ID', 'name', 'synonyms', 'formula', 'mol_weight',
+                 'inchi', 'inchi_key', 'cas_rn', 'IR', 'TZ', 'MS', 'UV',
+                 'mol2D', 'mol3D', 'data_refs')
+    
     # NIST URLs
     _NIST_URL = 'https://webbook.nist.gov'
     _COMP_ID = '/cgi/cbook.cgi'
     
+    # number of simultaneous requests to NIST
+    _MAX_WORKERS = _MAX_REQUESTS
+    
     # mappings for spectra
-    _MASKS = {'1': 'cTG', '2': 'cTC', '4': 'cTP', '8': 'cTR', '10': 'cSO',
-              '20': 'cIE', '40': 'cIC', '80': 'cIR', '100': 'cTZ', '200': 'cMS',
-              '400': 'cUV', '800': 'cES', '1000': 'cDI', '2000': 'cGC'}
-    _SPECS = {'IR': 'IR', 'TZ': 'THz', 'MS': 'Mass', 'UV': 'UVVis'}
+    _MASKS = MappingProxyType({'1': 'cTG', '2': 'cTC', '4': 'cTP', '8': 'cTR', '10': 'cSO',
+                               '20': 'cIE', '40': 'cIC', '80': 'cIR', '100': 'cTZ', '200': 'cMS',
+                               '400': 'cUV', '800': 'cES', '1000': 'cDI', '2000': 'cGC'})
+    _SPECS = MappingProxyType({'IR': 'IR', 'TZ': 'THz', 'MS': 'Mass', 'UV': 'UVVis'})
     
     def _load_compound_info(self):
         '''
         Loads main compound info
         '''
-        r = requests.get(self._NIST_URL + self._COMP_ID, {'ID': self.ID, 'Units': 'SI'})
+        r = _http_get(self._NIST_URL + self._COMP_ID,
+                      params = {'ID': self.ID, 'Units': 'SI'})
         if not r.ok:
             raise ConnectionError(f'Bad NIST response, status code: {r.status_code}')
+        self._parse_compound_info(r.content, r.encoding)
+    
+    def _parse_compound_info(self, html, encoding = None):
+        '''
+        Extracts main compound info from the compound webpage
+        '''
         # check if it is compound page
-        soup = BeautifulSoup(re.sub('clss=', 'class=', r.text),
-                             features = 'html.parser')
-        header = soup.findAll('h1', {'id': 'Top'})
+        soup = _make_soup(html, encoding, _COMPOUND_TAGS)
+        header = soup.find('h1', {'id': 'Top'})
         if not header:
             raise ValueError(f'Bad compound ID: {self.ID}')
-        header = header[0]
         # get info
         info = header.findNext('ul')
         if not info:
             raise ValueError(f'Bad compound ID: {self.ID}')
         # name
         self.name = header.text
-        # synonyms
-        hits = info.findChildren(text = re.compile('Other names'))
-        if hits:
-            text = hits[0].findParent('li').text.replace('Other names:', '')
-            synonyms = [_.strip(';').strip() for _ in text.split('\n')]
-            self.synonyms = [_ for _ in synonyms if _]
-        # formula
-        hits = info.findChildren(text = re.compile('Formula'))
-        if hits:
-            text = hits[0].findParent('li').text.replace('Formula:', '')
-            self.formula = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text.strip())
-        # mol weight
-        hits = info.findChildren(text = re.compile('Molecular weight'))
-        if hits:
-            text = hits[0].findParent('li').text.replace('Molecular weight:', '')
-            self.mol_weight = float(text)
+        # text fields, nested lists carry only links
+        for li in info.find_all('li', recursive = False):
+            # skip by <strong> label to avoid joining text of long link lists
+            label = li.find('strong')
+            if label is not None and not _RE_FIELDS.match(label.get_text()):
+                continue
+            text = li.get_text()
+            match = _RE_FIELDS.match(text)
+            if match:
+                attr, parse = _FIELD_PARSERS[match.group(1)]
+                setattr(self, attr, parse(text[match.end():]))
         # InChI and InChI key
-        hits = info.findChildren(attrs = {'class': 'inchi-text'})
-        if hits:
-            for hit in hits:
-                if 'InChI=' in hit.text:
-                    self.inchi = hit.text
-                elif re.search(r'', hit.text):
-                    self.inchi_key = hit.text
-        # CAS RN
-        hits = info.findChildren(text = re.compile('CAS Registry Number:'))
-        if hits:
-            text = hits[0].findParent('li').text.replace('CAS Registry Number:', '')
-            self.cas_rn = text.strip()
-        # 2D structure
-        hits = info.findChildren(attrs = {'href': re.compile('Str2File')})
-        if hits:
-            self.data_refs['mol2D'] = self._NIST_URL + hits[0].attrs['href']
-        # 3D structure
-        hits = info.findChildren(attrs = {'href': re.compile('Str3File')})
-        if hits:
-            self.data_refs['mol3D'] = self._NIST_URL + hits[0].attrs['href']
-        # other data and spectroscopy
-        hits = info.findChildren(attrs = {'href': re.compile('/cgi/cbook.cgi.*Mask=\d')})
-        for hit in hits:
-            mask = re.search('Mask=(\d+)', hit.attrs['href']).group(1)
-            key = self._MASKS.get(mask, hit.text)
-            if key in self.data_refs:
-                self.data_refs[key] += [self._NIST_URL + hit.attrs['href']]
+        for hit in info.find_all(attrs = {'class': 'inchi-text'}):
+            text = hit.get_text()
+            if text.startswith('InChI='):
+                self.inchi = text
+            else:
+                self.inchi_key = text
+        # structures, other data and spectroscopy
+        data_refs = {}
+        base, masks = self._NIST_URL, self._MASKS
+        for hit in info.find_all(href = True):
+            href = hit.attrs['href']
+            if 'Str2File' in href:
+                data_refs.setdefault('mol2D', base + href)
+            elif 'Str3File' in href:
+                data_refs.setdefault('mol3D', base + href)
             else:
-                self.data_refs[key] = [self._NIST_URL + hit.attrs['href']]
+                match = _RE_MASK.search(href)
+                if not match:
+                    continue
+                key = masks.get(match.group(1), hit.text)
+                data_refs.setdefault(key, []).append(base + href)
+        self.data_refs = data_refs
     
     def get_2D(self):
         '''
@@ -189,7 +504,7 @@ class Compound():
         '''
         if 'mol2D' not in self.data_refs:
             return
-        r = requests.get(self.data_refs['mol2D'])
+        r = _http_get(self.data_refs['mol2D'])
         if r.ok:
             self.mol2D = r.text
     
@@ -199,35 +514,51 @@ class Compound():
         '''
         if 'mol3D' not in self.data_refs:
             return
-        r = requests.get(self.data_refs['mol3D'])
+        r = _http_get(self.data_refs['mol3D'])
         if r.ok:
             self.mol3D = r.text
     
-    def get_spectra(self, spec_type):
+    def _load_spectrum(self, spec_type, idx, path_dir = None):
         '''
-        Loads available mass spectra in JCAMP-DX format
+        Downloads single spectrum, streams it to file if path_dir is given
+        '''
+        url = self._NIST_URL + self._COMP_ID
+        params = {'JCAMP': self.ID, 'Index': idx, 'Type': self._SPECS[spec_type]}
+        if not path_dir:
+            r = _http_get(url, params = params)
+            return Spectrum(self, spec_type, idx, r.text) if r.ok else None
+        path = os.path.join(path_dir, f'{self.ID}_{spec_type}_{idx}.jdx')
+        r = _http_download(url, path, params = params)
+        if not r.ok:
+            return None
+        
+        return Spectrum(self, spec_type, idx, path = path, encoding = r.encoding)
+    
+    def get_spectra(self, spec_type, path_dir = None, max_workers = None):
+        '''
+        Loads available spectra of given type in JCAMP-DX format,
+        previously loaded spectra of this type are replaced
+        path_dir: if given, spectra are streamed directly to JDX files
+                  in this folder and are not kept in memory
+        max_workers: number of worker threads, requests to NIST are also capped process-wide
         '''
         if spec_type not in self._SPECS:
             raise ValueError(f'Bad spec_type value: {spec_type}')
+        if path_dir and not os.path.isdir(path_dir):
+            raise ValueError(f'"{path_dir}" must be directory')
         if 'c'+spec_type not in self.data_refs:
             return
-        r = requests.get(self.data_refs['c'+spec_type][0])
+        r = _http_get(self.data_refs['c'+spec_type][0])
         if not r.ok:
             return
-        soup = BeautifulSoup(re.sub('clss=', 'class=', r.text),
-                             features = 'html.parser')
         # get available spectrum indexes
-        idxs = soup.findAll(attrs = {'href': re.compile('Index=')})
-        idxs = [re.search(r'Index=(\d+)', _.attrs['href']).group(1) for _ in idxs]
-        idxs = sorted(list(set(idxs)))
+        idxs = list(dict.fromkeys(_RE_INDEX.findall(r.text)))
         # load jdxs
-        for idx in idxs:
-            spec = requests.get(self._NIST_URL + self._COMP_ID,
-                                {'JCAMP': self.ID, 'Index': idx,
-                                 'Type': self._SPECS[spec_type]})
-            if spec.ok:
-                spec = Spectrum(self, spec_type, idx, spec.text)
-                getattr(self, spec_type).append(spec)
+        tasks = [functools.partial(self._load_spectrum, spec_type, idx, path_dir) \
+                 for idx in idxs]
+        specs = _run_concurrently(tasks, max_workers or self._MAX_WORKERS)
+        # replace, not extend: compounds shared between searches must not stack duplicates
+        setattr(self, spec_type, [spec for spec in specs if spec])
     
     def get_ir_spectra(self):
         '''
@@ -257,22 +588,25 @@ class Compound():
         
         return self.get_spectra('UV')
     
-    def get_all_spectra(self):
+    def get_all_spectra(self, max_workers = None):
         '''
         Loads available spectroscopic data
+        max_workers: number of worker threads, requests to NIST are also capped process-wide
+                     per spectrum type
         '''
-        self.get_ir_spectra()
-        self.get_tz_spectra()
-        self.get_ms_spectra()
-        self.get_uv_spectra()
+        tasks = [functools.partial(self.get_spectra, spec_type, max_workers = max_workers) \
+                 for spec_type in self._SPECS]
+        _run_concurrently(tasks, len(tasks))
     
-    def get_all_data(self):
+    def get_all_data(self, max_workers = None):
         '''
         Loads available structural and spectroscopic data
+        max_workers: number of worker threads, requests to NIST are also capped process-wide
+                     per spectrum type
         '''
-        self.get_2D()
-        self.get_3D()
-        self.get_all_spectra()
+        tasks = [self.get_2D, self.get_3D,
+                 functools.partial(self.get_all_spectra, max_workers = max_workers)]
+        _run_concurrently(tasks, len(tasks))
     
     def save_spectra(self, spec_type, path_dir = './'):
         '''
@@ -280,8 +614,10 @@ class Compound():
         '''
         if not os.path.isdir(path_dir):
             raise ValueError(f'"{path_dir}" must be directory')
-        for spec in getattr(self, spec_type):
-            spec.save(f'{self.ID}_{spec_type}_{spec.spec_idx}.jdx', path_dir)
+        futures = [spec.save_async(f'{self.ID}_{spec_type}_{spec.spec_idx}.jdx', path_dir) \
+                   for spec in getattr(self, spec_type)]
+        for future in futures:
+            future.result()
     
     def save_ir_spectra(self, path_dir = './'):
         '''
@@ -309,22 +645,35 @@ class Compound():
     
     def save_all_spectra(self, path_dir = './'):
         '''
-        Saves all UV-Vis spectra to the specified folder
+        Saves all spectra to the specified folder
         '''
-        self.save_ir_spectra(path_dir)
-        self.save_tz_spectra(path_dir)
-        self.save_ms_spectra(path_dir)
-        self.save_uv_spectra(path_dir)
+        if not os.path.isdir(path_dir):
+            raise ValueError(f'"{path_dir}" must be directory')
+        futures = [spec.save_async(f'{self.ID}_{spec_type}_{spec.spec_idx}.jdx', path_dir) \
+                   for spec_type in self._SPECS for spec in getattr(self, spec_type)]
+        for future in futures:
+            future.result()
     
-    def __init__(self, ID):
+    def __init__(self, ID, html = None):
         self.ID = ID
-        for prop, val in [('name', None), ('synonyms', []), ('formula', None), ('mol_weight', None),
-                          ('inchi', None), ('inchi_key', None), ('cas_rn', None),
-                          ('IR', []), ('TZ', []), ('MS', []), ('UV', []),
-                          ('mol2D', None), ('mol3D', None),
-                          ('data_refs', {})]:
-            setattr(self, prop, val)
-        self._load_compound_info()
+        self.name = None
+        self.synonyms = []
+        self.formula = None
+        self.mol_weight = None
+        self.inchi = None
+        self.inchi_key = None
+        self.cas_rn = None
+        self.IR = []
+        self.TZ = []
+        self.MS = []
+        self.UV = []
+        self.mol2D = None
+        self.mol3D = None
+        self.data_refs = {}
+        if html is None:
+            self._load_compound_info()
+        else:
+            self._parse_compound_info(html)
     
     def __str__(self):
         return f'Compound({self.ID})'
@@ -333,35 +682,60 @@ class Compound():
         return f'Compound({self.ID})'
 
 
+@functools.lru_cache(maxsize = 4096)
+def _cached_compound(ID):
+    '''
+    Returns Compound object cached by NIST ID; the same object is returned
+    for repeated IDs, so data loaded into it later is shared as well
+    '''
+    return Compound(ID)
+
+
+def get_compounds(IDs, max_workers = None):
+    '''
+    Loads compounds with given NIST IDs, several requests are sent simultaneously
+    max_workers: number of worker threads, requests to NIST are also capped process-wide
+    Compounds are cached by ID, so the same object is returned for repeated IDs
+    '''
+    # each ID is requested once, concurrent cache misses would load it twice
+    unique = list(dict.fromkeys(IDs))
+    tasks = [functools.partial(_cached_compound, ID) for ID in unique]
+    compounds = dict(zip(unique, _run_concurrently(tasks, max_workers or Compound._MAX_WORKERS)))
+    
+    return [compounds[ID] for ID in IDs]
+
+
 #%% Search-related classes
 
+_SEARCH_PARAMETERS_INFO = {'Units': 'Units for thermodynamic data, "SI" or "CAL" for calorie-based',
+                           'MatchIso': 'Exactly match the specified isotopes (formula search only)',
+                           'AllowOther': 'Allow elements not specified in formula (formula search only)',
+                           'AllowExtra': 'Allow more atoms of elements in formula than specified (formula search only)',
+                           'NoIon': 'Exclude ions from the search (formula search only)',
+                           'cTG': 'Contains gas-phase thermodynamic data',
+                           'cTC': 'Contains condensed-phase thermodynamic data',
+                           'cTP': 'Contains phase-change thermodynamic data',
+                           'cTR': 'Contains reaction thermodynamic data',
+                           'cIE': 'Contains ion energetics thermodynamic data',
+                           'cIC': 'Contains ion cluster thermodynamic data',
+                           'cIR': 'Contains IR data',
+                           'cTZ': 'Contains THz IR data',
+                           'cMS': 'Contains MS data',
+                           'cUV': 'Contains UV/Vis data',
+                           'cGC': 'Contains gas chromatography data',
+                           'cES': 'Contains vibrational and electronic energy levels',
+                           'cDI': 'Contains constants of diatomic molecules',
+                           'cSO': 'Contains info on Henry\'s law'}
+_MAX_KEY_LEN = max(len(key) for key in _SEARCH_PARAMETERS_INFO)
+_SEARCH_PARAMETERS_HELP = '\n'.join(f'{key:<{_MAX_KEY_LEN}} :   {val}' \
+                                    for key, val in _SEARCH_PARAMETERS_INFO.items())
+
+
 def print_search_parameters():
     '''
     Prints available search parameters
     '''
-    info = {'Units': 'Units for thermodynamic data, "SI" or "CAL" for calorie-based',
-            'MatchIso': 'Exactly match the specified isotopes (formula search only)',
-            'AllowOther': 'Allow elements not specified in formula (formula search only)',
-            'AllowExtra': 'Allow more atoms of elements in formula than specified (formula search only)',
-            'NoIon': 'Exclude ions from the search (formula search only)',
-            'cTG': 'Contains gas-phase thermodynamic data',
-            'cTC': 'Contains condensed-phase thermodynamic data',
-            'cTP': 'Contains phase-change thermodynamic data',
-            'cTR': 'Contains reaction thermodynamic data',
-            'cIE': 'Contains ion energetics thermodynamic data',
-            'cIC': 'Contains ion cluster thermodynamic data',
-            'cIR': 'Contains IR data',
-            'cTZ': 'Contains THz IR data',
-            'cMS': 'Contains MS data',
-            'cUV': 'Contains UV/Vis data',
-            'cGC': 'Contains gas chromatography data',
-            'cES': 'Contains vibrational and electronic energy levels',
-            'cDI': 'Contains constants of diatomic molecules',
-            'cSO': 'Contains info on Henry\'s law'}
-    max_len = max([len(_) for _ in info])
-    spaces = [' '*(max_len - len(_) + 1) for _ in info]
-    for (key, val), space in zip(info.items(), spaces):
-        print(f'{key}{space}:   {val}')
+    print(_SEARCH_PARAMETERS_HELP)
 
 
 class SearchParameters():
@@ -375,18 +749,16 @@ class SearchParameters():
             'cTG': False, 'cTC': False, 'cTP': False, 'cTR': False, 'cIE': False, 'cIC': False,
             'cIR': False, 'cTZ': False, 'cMS': False, 'cUV': False, 'cGC': False,
             'cES': False, 'cDI': False, 'cSO': False}
+    __slots__ = tuple(info)
+    _FLAG_KEYS = tuple(key for key in info if key != 'Units')
+    _FLAG_KEY_SET = frozenset(_FLAG_KEYS)
     
     def get_request_parameters(self):
         '''
         Returns dictionary with GET parameters
         '''
         params = {'Units': self.Units}
-        for key in self.info:
-            if key == 'Units':
-                continue
-            val = getattr(self, key)
-            if val:
-                params[key] = 'on'
+        params.update((key, 'on') for key in self._FLAG_KEYS if getattr(self, key))
         
         return params
     
@@ -396,29 +768,25 @@ class SearchParameters():
             setattr(self, key, val)
         # check kwargs
         for key, val in kwargs.items():
-            if key not in self.info:
+            if key == 'Units':
+                if val not in ('SI', 'CAL'):
+                    raise ValueError(f'Bad value for "Units" parameter: {val}')
+            elif key in self._FLAG_KEY_SET:
+                if not isinstance(val, bool):
+                    raise ValueError(f'Bad value for "{key}" parameter: {val}')
+            else:
                 raise TypeError(f'"{key}" is an invalid keyword argument for SearchParameters')
-            if key == 'Units' and val not in ('SI', 'CAL'):
-                raise ValueError(f'Bad value for "Units" parameter: {val}')
-            if key != 'Units' and type(val) is not bool:
-                raise ValueError(f'Bad value for "{key}" parameter: {val}')
             setattr(self, key, val)
     
-    def __str__(self):
-        sep = ', ' # ',\n' + ' '*17
-        text = [f'SearchParameters(Units={self.Units}'] + \
-               [f'{key}={getattr(self, key)}' for key in self.info if key != 'Units' and getattr(self, key)]
-        text[-1] = text[-1] + ')'
-        
-        return sep.join(text)
-    
     def __repr__(self):
         sep = ', ' # ',\n' + ' '*17
         text = [f'SearchParameters(Units={self.Units}'] + \
-               [f'{key}={getattr(self, key)}' for key in self.info if key != 'Units' and getattr(self, key)]
+               [f'{key}={getattr(self, key)}' for key in self._FLAG_KEYS if getattr(self, key)]
         text[-1] = text[-1] + ')'
         
         return sep.join(text)
+    
+    __str__ = __repr__
 
 
 class Search():
@@ -426,6 +794,8 @@ class Search():
     Object for searching in NIST Chemistry WebBook
     '''
     
+    __slots__ = ('parameters', 'IDs', 'compounds', 'lost', 'success')
+    
     # NIST URLs
     _NIST_URL = 'https://webbook.nist.gov'
     _COMP_ID = '/cgi/cbook.cgi'
@@ -457,33 +827,28 @@ class Search():
         addend = SearchParameters(**kwargs)
         params.update(addend.get_request_parameters())
         # load webpage
-        r = requests.get(self._NIST_URL + self._COMP_ID, params)
+        r = _http_get(self._NIST_URL + self._COMP_ID, params = params)
         if not r.ok:
             self.success = False
             self.IDs = []
             self.compounds = []
             self.lost = False
             return
-        soup = BeautifulSoup(re.sub('clss=', 'class=', r.text),
-                             features = 'html.parser')
+        html = r.text
         # check if no compounds
         if search_type == 'inchi':
             errs = ['information from the inchi', 'no matching species found']
         else:
             errs = ['not found']
-        err_flag = False
-        for err in errs:
-            if sum([err in _.text.lower() for _ in soup.findAll('h1')]):
-                err_flag = True
-                break
-        if err_flag:
+        headers = [_.lower() for _ in _RE_H1.findall(html)]
+        if any(err in header for err in errs for header in headers):
             self.success = True
             self.IDs = []
             self.compounds = []
             self.lost = False
             return
         # check if one compound
-        flag = _is_compound(soup)
+        flag = _is_compound(html)
         if flag:
             self.success = True
             self.IDs = [flag]
@@ -491,18 +856,22 @@ class Search():
             self.lost = False
             return
         # extract IDs
-        refs = soup.find('ol').findChildren('a', href = re.compile(self._COMP_ID))
-        IDs = [parse_qs(urlparse(a.attrs['href']).query)['ID'][0] for a in refs]
+        found = _RE_OL.search(html)
+        refs = _RE_COMP_HREF.findall(found.group()) if found else []
+        IDs = [_RE_ID.search(unescape(href)) for href in refs]
+        IDs = [_unquote_id(match.group(1)) for match in IDs if match]
         self.IDs = IDs
         self.compounds = []
         self.success = True
-        self.lost = 'Due to the large number of matching species' in soup.text
+        self.lost = bool(_RE_LOST.search(html))
     
-    def load_found_compounds(self):
+    def load_found_compounds(self, max_workers = None):
         '''
-        Loads compounds
+        Loads compounds; compounds which were already loaded by previous
+        searches are reused instead of being requested again
+        max_workers: number of worker threads, requests to NIST are also capped process-wide
         '''
-        self.compounds = [Compound(ID) for ID in self.IDs]
+        self.compounds = get_compounds(self.IDs, max_workers)
     
     def __str__(self):
         return f'Search(Success={self.success}, Lost={self.lost}, Found={len(self.IDs)})'